@@ -4,140 +4,193 @@ FridAPK - Command Line Interface
 """
 
 import argparse
+import functools
 import sys
 from pathlib import Path
-from typing import List, Optional
-
-from utils.colors import Colors
-from utils.logger import Logger, VerbosityLevel
+from typing import List, Optional, Tuple
+
+# Groups that are only relevant when an APK is actually being patched
+_APK_GROUPS = ("processing", "interactive")
+
+
+def _build_base(allow_abbrev: bool = True) -> argparse.ArgumentParser:
+    """Create the bare argument parser"""
+    return argparse.ArgumentParser(
+        prog="fridapk",
+        description="FridAPK - Automatically patch Android APKs with Frida Gadget",
+        epilog="For detailed usage examples, visit: "
+        "https://github.com/sudo-Tiz/fridapk",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        allow_abbrev=allow_abbrev,
+    )
+
+
+def _build_main_group(parser: argparse.ArgumentParser) -> None:
+    """Register main options"""
+    main_group = parser.add_argument_group("Main options")
+    main_group.add_argument(
+        "-a", "--apk", type=Path, help="APK file to patch", metavar="FILE"
+    )
+
+    main_group.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        help="Output file path for patched APK",
+        metavar="FILE",
+    )
+
+    main_group.add_argument(
+        "-v",
+        "--verbosity",
+        type=int,
+        choices=[1, 2, 3],
+        default=3,
+        help="Verbosity level: 1=errors only, 2=+warnings, 3=all (default: 3)",
+    )
+
+
+def _build_gadget_group(parser: argparse.ArgumentParser) -> None:
+    """Register Frida Gadget options"""
+    gadget_group = parser.add_argument_group("Frida Gadget options")
+    gadget_group.add_argument(
+        "-g",
+        "--gadget",
+        type=Path,
+        help="Specific Frida gadget file to use",
+        metavar="FILE",
+    )
+
+    gadget_group.add_argument(
+        "--autoload-script",
+        type=Path,
+        help="JavaScript file to auto-load with gadget",
+        metavar="FILE",
+    )
+
+    gadget_group.add_argument(
+        "--prevent-gadget", action="store_true", help="Skip Frida gadget injection"
+    )
+
+    gadget_group.add_argument(
+        "--update-gadgets",
+        action="store_true",
+        help="Download/update Frida gadgets for current Frida version",
+    )
+
+
+def _build_processing_group(parser: argparse.ArgumentParser) -> None:
+    """Register APK processing options"""
+    processing_group = parser.add_argument_group("APK processing options")
+    processing_group.add_argument(
+        "-f",
+        "--force-resources",
+        action="store_true",
+        help="Force extraction of resources and manifest",
+    )
+
+    processing_group.add_argument(
+        "--use-aapt2",
+        action="store_true",
+        help="Use aapt2 with apktool for building",
+    )
+
+    processing_group.add_argument(
+        "--enable-user-certs",
+        action="store_true",
+        help="Enable user certificate authorities in APK",
+    )
+
+    processing_group.add_argument(
+        "-k",
+        "--keep-keystore",
+        action="store_true",
+        help="Keep generated keystore for future use",
+    )
+
+
+def _build_interactive_group(parser: argparse.ArgumentParser) -> None:
+    """Register interactive options"""
+    interactive_group = parser.add_argument_group("Interactive options")
+    interactive_group.add_argument(
+        "-w",
+        "--wait",
+        action="store_true",
+        help="Wait for user confirmation before repackaging",
+    )
+
+    interactive_group.add_argument(
+        "-x",
+        "--exec-command",
+        type=str,
+        help="Execute shell command before repackaging",
+        metavar="CMD",
+    )
+
+    interactive_group.add_argument(
+        "--pass-temp-path",
+        action="store_true",
+        help="Pass temporary APK directory to --exec-command",
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _create_parser(groups: Tuple[str, ...]) -> argparse.ArgumentParser:
+    """Create (and cache) a parser with only the requested argument groups"""
+    # A slim parser can't tell whether an abbreviation would be ambiguous
+    # among the options it lacks, so it only takes exact option strings and
+    # leaves abbreviations to the full parser
+    parser = _build_base(allow_abbrev=groups == _APK_GROUPS)
+    _build_main_group(parser)
+    _build_gadget_group(parser)
+
+    if "processing" in groups:
+        _build_processing_group(parser)
+    if "interactive" in groups:
+        _build_interactive_group(parser)
+
+    return parser
+
+
+def _sniff_groups(argv: List[str]) -> Tuple[str, ...]:
+    """Decide which optional argument groups the command line needs"""
+    if any(arg in ("-h", "--help") for arg in argv):
+        return _APK_GROUPS
+
+    has_apk = any(
+        arg in ("-a", "--apk") or arg.startswith(("--apk=", "-a")) for arg in argv
+    )
+    if "--update-gadgets" in argv and not has_apk:
+        return ()
+
+    return _APK_GROUPS
 
 
 class CLI:
     """Command Line Interface for FridAPK"""
 
     def __init__(self):
-        self.parser = self._create_parser()
-        self.logger = Logger()
+        from utils.logger import Logger
 
-    def _create_parser(self) -> argparse.ArgumentParser:
-        """Create and configure argument parser"""
-        parser = argparse.ArgumentParser(
-            prog="fridapk",
-            description="FridAPK - Automatically patch Android APKs with Frida Gadget",
-            epilog="For detailed usage examples, visit: "
-            "https://github.com/sudo-Tiz/fridapk",
-            formatter_class=argparse.RawDescriptionHelpFormatter,
-        )
-
-        # Main arguments
-        main_group = parser.add_argument_group("Main options")
-        main_group.add_argument(
-            "-a", "--apk", type=Path, help="APK file to patch", metavar="FILE"
-        )
-
-        main_group.add_argument(
-            "-o",
-            "--output",
-            type=Path,
-            help="Output file path for patched APK",
-            metavar="FILE",
-        )
-
-        main_group.add_argument(
-            "-v",
-            "--verbosity",
-            type=int,
-            choices=[1, 2, 3],
-            default=3,
-            help="Verbosity level: 1=errors only, 2=+warnings, 3=all (default: 3)",
-        )
-
-        # Gadget options
-        gadget_group = parser.add_argument_group("Frida Gadget options")
-        gadget_group.add_argument(
-            "-g",
-            "--gadget",
-            type=Path,
-            help="Specific Frida gadget file to use",
-            metavar="FILE",
-        )
-
-        gadget_group.add_argument(
-            "--autoload-script",
-            type=Path,
-            help="JavaScript file to auto-load with gadget",
-            metavar="FILE",
-        )
-
-        gadget_group.add_argument(
-            "--prevent-gadget", action="store_true", help="Skip Frida gadget injection"
-        )
-
-        gadget_group.add_argument(
-            "--update-gadgets",
-            action="store_true",
-            help="Download/update Frida gadgets for current Frida version",
-        )
-
-        # APK processing options
-        processing_group = parser.add_argument_group("APK processing options")
-        processing_group.add_argument(
-            "-f",
-            "--force-resources",
-            action="store_true",
-            help="Force extraction of resources and manifest",
-        )
-
-        processing_group.add_argument(
-            "--use-aapt2",
-            action="store_true",
-            help="Use aapt2 with apktool for building",
-        )
-
-        processing_group.add_argument(
-            "--enable-user-certs",
-            action="store_true",
-            help="Enable user certificate authorities in APK",
-        )
-
-        processing_group.add_argument(
-            "-k",
-            "--keep-keystore",
-            action="store_true",
-            help="Keep generated keystore for future use",
-        )
-
-        # Interactive options
-        interactive_group = parser.add_argument_group("Interactive options")
-        interactive_group.add_argument(
-            "-w",
-            "--wait",
-            action="store_true",
-            help="Wait for user confirmation before repackaging",
-        )
-
-        interactive_group.add_argument(
-            "-x",
-            "--exec-command",
-            type=str,
-            help="Execute shell command before repackaging",
-            metavar="CMD",
-        )
-
-        interactive_group.add_argument(
-            "--pass-temp-path",
-            action="store_true",
-            help="Pass temporary APK directory to --exec-command",
-        )
-
-        return parser
+        self.parser = None
+        self.logger = Logger()
 
     def parse_args(self, args: Optional[List[str]] = None) -> argparse.Namespace:
         """Parse command line arguments"""
-        parsed_args = self.parser.parse_args(args)
+        argv = sys.argv[1:] if args is None else list(args)
+        groups = _sniff_groups(argv)
+        self.parser = _create_parser(groups)
+
+        # Options from skipped groups: fall back to the full parser
+        if groups != _APK_GROUPS:
+            _, unknown = self.parser.parse_known_args(argv)
+            if unknown:
+                self.parser = _create_parser(_APK_GROUPS)
+
+        parsed_args = self.parser.parse_args(argv)
 
         # Set logger verbosity
-        self.logger.set_verbosity(VerbosityLevel(parsed_args.verbosity))
+        self.logger.set_verbosity(parsed_args.verbosity)
 
         # Validate arguments
         self._validate_args(parsed_args)
@@ -162,13 +215,15 @@ class CLI:
         if args.autoload_script and not args.autoload_script.exists():
             self.parser.error(f"Autoload script not found: {args.autoload_script}")
 
-        # Validate exec command options
-        if args.pass_temp_path and not args.exec_command:
+        # Validate exec command options (interactive group may not be built)
+        if getattr(args, "pass_temp_path", False) and not args.exec_command:
             self.parser.error("--pass-temp-path requires --exec-command")
 
-    def print_banner(self) -> None:
-        """Print application banner"""
-        banner = f"""
+    def _format_banner(self) -> str:
+        """Build application banner"""
+        from utils.logger import STDOUT_COLORS as Colors
+
+        return f"""
 {Colors.CYAN}╔══════════════════════════════════════════════════════════════╗
 ║                          FridAPK                            ║
 ║              Frida Gadget injection made easy               ║
@@ -179,26 +234,29 @@ class CLI:
 {Colors.BLUE}✓{Colors.ENDC} Auto-load JavaScript hooks
 {Colors.BLUE}✓{Colors.ENDC} APK signing and alignment
 """
-        print(banner)
+
+    def print_banner(self) -> None:
+        """Print application banner"""
+        sys.stdout.write(self._format_banner() + "\n")
+        sys.stdout.flush()
 
     def handle_no_args(self) -> None:
         """Handle case when no arguments provided"""
-        self.print_banner()
-        print(
+        from utils.logger import STDOUT_COLORS as Colors
+
+        # Emit everything with a single write
+        lines = [
+            self._format_banner(),
             f"\n{Colors.YELLOW}No arguments provided. "
-            f"Use -h/--help for usage information.{Colors.ENDC}"
-        )
-        print(f"\n{Colors.BLUE}Quick start examples: {Colors.ENDC}")
-        print(
+            f"Use -h/--help for usage information.{Colors.ENDC}",
+            f"\n{Colors.BLUE}Quick start examples: {Colors.ENDC}",
             f"  {Colors.GREEN}fridapk -a app.apk{Colors.ENDC}                    "
-            f"# Patch with auto-detected gadget"
-        )
-        print(
+            f"# Patch with auto-detected gadget",
             f"  {Colors.GREEN}fridapk --update-gadgets{Colors.ENDC}             "
-            f"# Download latest gadgets"
-        )
-        print(
+            f"# Download latest gadgets",
             f"  {Colors.GREEN}fridapk -a app.apk --enable-user-certs{Colors.ENDC} "
-            f"# Enable user certificates"
-        )
+            f"# Enable user certificates",
+        ]
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
         sys.exit(1)
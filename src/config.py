@@ -6,7 +6,8 @@ FridAPK - Configuration settings
 import os
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List
+from types import MappingProxyType
+from typing import Mapping, Sequence
 
 
 class Architecture:
@@ -26,6 +27,17 @@ class FileNames:
     DEFAULT_HOOKFILE = "libhook.js.so"
     KEYSTORE = "fridapkkeystore"
     NETWORK_SECURITY_CONFIG = "network_security_config.xml"
+    EXTRACT_CACHE_DIR = ".extract_cache"
+    EXTRACT_SENTINEL = ".extract_complete"
+    RELEASE_CACHE = ".release_cache.json"
+
+
+class Signing:
+    """APK signing key settings"""
+
+    ALIAS = "fridapkalias1"
+    PASSWORD = "password"  # noqa: S105 - throwaway key for re-signing
+    DNAME = "CN=fridapk.com, OU=ID, O=FridAPK, L=Frida, S=APK, C=BR"
 
 
 class Permissions:
@@ -40,6 +52,37 @@ class URLs:
     FRIDA_RELEASES = "https://api.github.com/repos/frida/frida/releases"
 
 
+# Shared read-only defaults, referenced (not copied) by every Config
+_REQUIRED_TOOLS = (
+    "frida",
+    "aapt",
+    "adb",
+    "apktool",
+    "keytool",
+    "zipalign",
+    "apksigner",
+)
+
+_ARCH_MAPPING = MappingProxyType(
+    {
+        "armeabi": Architecture.ARM,
+        "armeabi-v7a": Architecture.ARM,
+        "arm64-v8a": Architecture.ARM64,
+        "x86": Architecture.X86,
+        "x86_64": Architecture.X64,
+    }
+)
+
+_LIB_DIRS = MappingProxyType(
+    {
+        Architecture.ARM: ("armeabi", "armeabi-v7a"),
+        Architecture.ARM64: ("arm64-v8a",),
+        Architecture.X86: ("x86",),
+        Architecture.X64: ("x86_64",),
+    }
+)
+
+
 @dataclass
 class Config:
     """APK Patcher configuration"""
@@ -49,13 +92,13 @@ class Config:
     temp_dir: Path = None
 
     # Dependencies
-    required_tools: List[str] = None
+    required_tools: Sequence[str] = None
 
     # Architecture mapping
-    arch_mapping: Dict[str, str] = None
+    arch_mapping: Mapping[str, str] = None
 
     # Lib directories for each architecture
-    lib_dirs: Dict[str, List[str]] = None
+    lib_dirs: Mapping[str, Sequence[str]] = None
 
     def __post_init__(self):
         # Set paths using environment variables with fallbacks
@@ -73,34 +116,13 @@ class Config:
             else:
                 self.temp_dir = Path("/tmp/fridapk")
         if self.required_tools is None:
-            self.required_tools = [
-                "frida",
-                "aapt",
-                "adb",
-                "apktool",
-                "unxz",
-                "keytool",
-                "jarsigner",
-                "zipalign",
-                "apksigner",
-            ]
+            self.required_tools = _REQUIRED_TOOLS
 
         if self.arch_mapping is None:
-            self.arch_mapping = {
-                "armeabi": Architecture.ARM,
-                "armeabi-v7a": Architecture.ARM,
-                "arm64-v8a": Architecture.ARM64,
-                "x86": Architecture.X86,
-                "x86_64": Architecture.X64,
-            }
+            self.arch_mapping = _ARCH_MAPPING
 
         if self.lib_dirs is None:
-            self.lib_dirs = {
-                Architecture.ARM: ["armeabi", "armeabi-v7a"],
-                Architecture.ARM64: ["arm64-v8a"],
-                Architecture.X86: ["x86"],
-                Architecture.X64: ["x86_64"],
-            }
-
-        # Create temp directory only (gadgets_dir already exists)
-        self.temp_dir.mkdir(parents=True, exist_ok=True)
+            self.lib_dirs = _LIB_DIRS
+
+        # temp_dir is created on demand by APKProcessor.create_temp_folder,
+        # so commands that never patch an APK don't touch the filesystem
@@ -1,7 +1,21 @@
 # FridAPK Core functionality
+#
+# Submodules are imported on first attribute access (PEP 562) so that
+# lightweight commands such as --help don't pay for subprocess/requests.
 
-from .apk_processor import APKProcessor
-from .dependencies import DependencyChecker
-from .gadgets import GadgetManager
+import importlib
+
+_MODULES = {
+    "APKProcessor": "apk_processor",
+    "DependencyChecker": "dependencies",
+    "GadgetManager": "gadgets",
+}
 
 __all__ = ["DependencyChecker", "GadgetManager", "APKProcessor"]
+
+
+def __getattr__(name):
+    if name in _MODULES:
+        module = importlib.import_module(f".{_MODULES[name]}", __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,16 +3,63 @@
 FridAPK - APK processing utilities
 """
 
+import hashlib
+import os
+import re
 import shutil
+import struct
 import subprocess
 import time
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
-from config import Config
+from config import Config, FileNames, Signing
 from exceptions import APKError, ExtractionError, RepackageError, SigningError
 from utils.logger import Logger
 
+# 'name' must directly follow the tag so sibling attributes can't match
+# Completed extractions kept in the cache, least recently used go first
+MAX_CACHED_EXTRACTIONS = 8
+_DIGEST_RE = re.compile(r"[0-9a-f]{16}")
+
+_LAUNCHABLE_ACTIVITY_RE = re.compile(rb"launchable-activity:\s+name='([^']+)'")
+
+
+def _decode(output: Optional[bytes]) -> str:
+    """Decode raw tool output, only needed when it is actually displayed"""
+    return output.decode("utf-8", "replace") if output else ""
+
+
+def _axml_len16(length: int) -> bytes:
+    """Encode a UTF-16 string pool length (one or two little-endian u16)"""
+    if length < 0x8000:
+        return struct.pack("<H", length)
+    return struct.pack("<HH", (length >> 16) | 0x8000, length & 0xFFFF)
+
+
+def _axml_len8(length: int) -> bytes:
+    """Encode a UTF-8 string pool length (one or two bytes)"""
+    if length < 0x80:
+        return bytes((length,))
+    return bytes(((length >> 8) | 0x80, length & 0xFF))
+
+
+def _sha256_file(path: Path) -> str:
+    """Hash a file through a single reused buffer"""
+    sha256 = hashlib.sha256()
+    buf = bytearray(1 << 16)
+    view = memoryview(buf)
+
+    # Unbuffered FileIO: readinto fills buf directly, no per-chunk bytes
+    with open(path, "rb", buffering=0) as f:
+        while n := f.readinto(buf):
+            sha256.update(view[:n])
+
+    return sha256.hexdigest()
+
 
 class APKProcessor:
     """Handles APK extraction, modification, and repackaging"""
@@ -21,6 +68,47 @@ class APKProcessor:
         self.logger = logger
         self.config = config
 
+        # Signing command templates: only the APK path varies per call
+        self.keystore_path = Path(FileNames.KEYSTORE)
+        keystore = str(self.keystore_path)
+        self._keygen_cmd = (
+            "keytool",
+            "-genkey",
+            "-keyalg",
+            "RSA",
+            "-keysize",
+            "2048",
+            "-validity",
+            "700",
+            "-noprompt",
+            "-alias",
+            Signing.ALIAS,
+            "-dname",
+            Signing.DNAME,
+            "-keystore",
+            keystore,
+            "-storepass",
+            Signing.PASSWORD,
+            "-keypass",
+            Signing.PASSWORD,
+        )
+        self._sign_cmd_prefix = (
+            "apksigner",
+            "sign",
+            "--v1-signing-enabled",
+            "true",
+            "--v2-signing-enabled",
+            "true",
+            "--v3-signing-enabled",
+            "true",
+            "--ks-key-alias",
+            Signing.ALIAS,
+            "--ks",
+            keystore,
+            "--ks-pass",
+            f"pass:{Signing.PASSWORD}",
+        )
+
     def create_temp_folder(self, apk_path: Path) -> Path:
         """Create temporary folder for APK processing"""
         apk_name = apk_path.stem.replace(".", "_")
@@ -37,6 +125,77 @@ class APKProcessor:
 
     def extract_apk(
         self, apk_path: Path, destination: Path, extract_resources: bool = True
+    ) -> None:
+        """Extract APK, reusing a cached extraction of identical content"""
+        cache_dir = self._get_extraction_cache_dir(apk_path, extract_resources)
+        sentinel = cache_dir / FileNames.EXTRACT_SENTINEL
+
+        if sentinel.exists():
+            self.logger.info(f"Reusing cached extraction of {apk_path.name}")
+            # Mark as recently used
+            sentinel.touch()
+        else:
+            self._prune_extraction_cache(apk_path, cache_dir)
+            self._run_apktool_decode(apk_path, cache_dir, extract_resources)
+            sentinel.touch()
+
+        # The cache stays pristine: patching happens on a copy
+        shutil.copytree(
+            cache_dir,
+            destination,
+            dirs_exist_ok=True,
+            ignore=shutil.ignore_patterns(FileNames.EXTRACT_SENTINEL),
+        )
+
+    def _prune_extraction_cache(self, apk_path: Path, cache_dir: Path) -> None:
+        """Drop older extractions of this APK and cap the cache size"""
+        cache_root = cache_dir.parent
+        if not cache_root.is_dir():
+            return
+
+        prefix = f"{apk_path.stem.replace('.', '_')}_"
+        suffix = f"_{cache_dir.name.rsplit('_', 1)[1]}"
+        completed = []
+        for entry in os.scandir(cache_root):
+            name = entry.name
+            if not entry.is_dir() or name == cache_dir.name:
+                continue
+
+            # Same APK name and mode with another content digest, or partial
+            if (
+                name.startswith(prefix)
+                and name.endswith(suffix)
+                and _DIGEST_RE.fullmatch(name[len(prefix) : -len(suffix)])
+            ):
+                shutil.rmtree(entry.path, ignore_errors=True)
+                continue
+
+            sentinel = Path(entry.path) / FileNames.EXTRACT_SENTINEL
+            try:
+                completed.append((sentinel.stat().st_mtime, entry.path))
+            except OSError:
+                # Possibly still being extracted by another run
+                continue
+
+        # Leave room for the extraction about to be made
+        completed.sort()
+        for _, path in completed[: max(0, len(completed) - MAX_CACHED_EXTRACTIONS + 1)]:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _get_extraction_cache_dir(
+        self, apk_path: Path, extract_resources: bool
+    ) -> Path:
+        """Get the cache directory keyed by APK content and extraction mode"""
+        apk_name = apk_path.stem.replace(".", "_")
+        mode = "res" if extract_resources else "nores"
+        return (
+            self.config.temp_dir
+            / FileNames.EXTRACT_CACHE_DIR
+            / f"{apk_name}_{_sha256_file(apk_path)[:16]}_{mode}"
+        )
+
+    def _run_apktool_decode(
+        self, apk_path: Path, destination: Path, extract_resources: bool
     ) -> None:
         """Extract APK using apktool"""
         try:
@@ -55,13 +214,15 @@ class APKProcessor:
 
             cmd.extend(["d", "-o", str(destination), str(apk_path)])
 
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            result = subprocess.run(
+                cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True
+            )
 
             if result.stderr:
-                self.logger.debug(f"apktool stderr: {result.stderr}")
+                self.logger.debug(f"apktool stderr: {_decode(result.stderr)}")
 
         except subprocess.CalledProcessError as e:
-            error_msg = f"Failed to extract APK: {e.stderr if e.stderr else str(e)}"
+            error_msg = f"Failed to extract APK: {_decode(e.stderr) or str(e)}"
             raise ExtractionError(error_msg)
 
     def repackage_apk(
@@ -70,8 +231,7 @@ class APKProcessor:
         """Repackage APK using apktool"""
         # Generate unique filename if file exists
         if output_path.exists():
-            timestamp = str(time.time()).replace(".", "")
-            output_path = output_path.with_stem(f"{output_path.stem}_{timestamp}")
+            output_path = output_path.with_stem(f"{output_path.stem}_{time.time_ns()}")
 
         self.logger.info(f"Repackaging APK to {output_path}")
         self.logger.info("This may take some time...")
@@ -84,180 +244,189 @@ class APKProcessor:
 
             cmd.extend(["b", "-o", str(output_path), str(source_dir)])
 
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            result = subprocess.run(
+                cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True
+            )
 
             if result.stderr:
-                self.logger.debug(f"apktool stderr: {result.stderr}")
+                self.logger.debug(f"apktool stderr: {_decode(result.stderr)}")
 
             self.logger.success("APK repackaged successfully")
             return output_path
 
         except subprocess.CalledProcessError as e:
-            error_msg = f"Failed to repackage APK: {e.stderr if e.stderr else str(e)}"
+            error_msg = f"Failed to repackage APK: {_decode(e.stderr) or str(e)}"
             raise RepackageError(error_msg)
 
     def sign_and_align_apk(self, apk_path: Path, keep_keystore: bool = False) -> None:
         """Sign and align APK"""
-        try:
-            keystore_path = Path("fridapkkeystore")
-
-            # Generate keystore if needed
-            if not keystore_path.exists():
-                self._generate_keystore(keystore_path)
+        self.sign_and_align_apks([apk_path], keep_keystore)
 
-            # Sign with v1 signature
-            self._sign_v1(apk_path, keystore_path)
+    def sign_and_align_apks(
+        self, apk_paths: List[Path], keep_keystore: bool = False
+    ) -> None:
+        """Sign and align several APKs concurrently with a shared keystore"""
+        if not apk_paths:
+            return
 
-            # Align APK
-            self._align_apk(apk_path)
+        try:
+            keystore_path = self.keystore_path
 
-            # Sign with v2 signature
-            self._sign_v2(apk_path, keystore_path)
+            # Generate keystore once for the whole batch
+            if not keystore_path.exists():
+                self._generate_keystore()
+
+            # Steps for one APK are sequential, but APKs are independent and
+            # the work happens in external processes, so threads suffice
+            workers = min(len(apk_paths), os.cpu_count() or 1)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(self._sign_one, apk_path) for apk_path in apk_paths
+                ]
+                for future in futures:
+                    future.result()
 
             # Clean up keystore if requested
             if not keep_keystore and keystore_path.exists():
                 keystore_path.unlink()
 
-            self.logger.success("APK signed and aligned successfully")
+            if len(apk_paths) == 1:
+                self.logger.success("APK signed and aligned successfully")
+            else:
+                self.logger.success(
+                    f"{len(apk_paths)} APKs signed and aligned successfully"
+                )
 
         except Exception as e:
             raise SigningError(f"Failed to sign APK: {str(e)}")
 
-    def _generate_keystore(self, keystore_path: Path) -> None:
-        """Generate a keystore for signing"""
-        self.logger.info("Generating signing key...")
+    def _sign_one(self, apk_path: Path) -> None:
+        """Sign and align a single APK"""
+        # Align the unsigned APK first: v2+ signatures cover the alignment
+        self._align_apk(apk_path)
 
-        cmd = [
-            "keytool",
-            "-genkey",
-            "-keyalg",
-            "RSA",
-            "-keysize",
-            "2048",
-            "-validity",
-            "700",
-            "-noprompt",
-            "-alias",
-            "fridapkalias1",
-            "-dname",
-            "CN=fridapk.com, OU=ID, O=FridAPK, L=Frida, S=APK, C=BR",
-            "-keystore",
-            str(keystore_path),
-            "-storepass",
-            "password",
-            "-keypass",
-            "password",
-        ]
+        # Sign with v1, v2 and v3 signatures
+        self._sign(apk_path)
 
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            raise SigningError(f"Failed to generate keystore: {result.stderr}")
-
-    def _sign_v1(self, apk_path: Path, keystore_path: Path) -> None:
-        """Sign APK with v1 signature (jarsigner)"""
-        self.logger.info("Signing APK with v1 signature...")
-
-        cmd = [
-            "jarsigner",
-            "-sigalg",
-            "SHA1withRSA",
-            "-digestalg",
-            "SHA1",
-            "-keystore",
-            str(keystore_path),
-            "-storepass",
-            "password",
-            str(apk_path),
-            "fridapkalias1",
-        ]
+    def _generate_keystore(self) -> None:
+        """Generate a keystore for signing"""
+        self.logger.info("Generating signing key...")
 
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = subprocess.run(
+            self._keygen_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
         if result.returncode != 0:
-            raise SigningError(f"Failed to sign with jarsigner: {result.stderr}")
+            raise SigningError(f"Failed to generate keystore: {_decode(result.stderr)}")
 
     def _align_apk(self, apk_path: Path) -> None:
         """Align APK with zipalign"""
-        self.logger.info("Aligning APK with zipalign...")
+        self.logger.info(f"Aligning {apk_path.name} with zipalign...")
 
-        temp_path = apk_path.with_suffix(".tmp.apk")
-        apk_path.rename(temp_path)
+        # Align into a sibling file, then atomically swap it in
+        aligned_path = apk_path.with_suffix(".aligned.apk")
 
-        cmd = ["zipalign", "-p", "-f", "4", str(temp_path), str(apk_path)]
+        cmd = ["zipalign", "-p", "-f", "4", str(apk_path), str(aligned_path)]
 
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
         if result.returncode != 0:
-            # Restore original file
-            temp_path.rename(apk_path)
-            raise SigningError(f"Failed to align APK: {result.stderr}")
+            # The original APK is untouched, just drop the partial output
+            aligned_path.unlink(missing_ok=True)
+            raise SigningError(
+                f"Failed to align {apk_path.name}: {_decode(result.stderr)}"
+            )
 
-        temp_path.unlink()
+        aligned_path.replace(apk_path)
 
-    def _sign_v2(self, apk_path: Path, keystore_path: Path) -> None:
-        """Sign APK with v2 signature (apksigner)"""
-        self.logger.info("Signing APK with v2 signature...")
+    def _sign(self, apk_path: Path) -> None:
+        """Sign APK with v1, v2 and v3 signatures in one apksigner run"""
+        self.logger.info(f"Signing {apk_path.name} with v1/v2/v3 signatures...")
 
-        cmd = [
-            "apksigner",
-            "sign",
-            "--ks-key-alias",
-            "fridapkalias1",
-            "--ks",
-            str(keystore_path),
-            "--ks-pass",
-            "pass:password",
-            str(apk_path),
-        ]
+        cmd = self._sign_cmd_prefix + (str(apk_path),)
 
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
         if result.returncode != 0:
-            self.logger.warning(f"v2 signing failed: {result.stderr}")
-            # v2 signing is optional, so we don't raise an error
+            raise SigningError(
+                f"Failed to sign {apk_path.name} with apksigner: "
+                f"{_decode(result.stderr)}"
+            )
 
     def has_permission(self, apk_path: Path, permission: str) -> bool:
         """Check if APK has specific permission"""
+        has_perm = self._has_permission_fast(apk_path, permission)
+        if has_perm is None:
+            has_perm = self._has_permission_aapt(apk_path, permission)
+
+        if has_perm:
+            self.logger.info(f'APK has permission "{permission}"')
+        else:
+            self.logger.info(f'APK does not have permission "{permission}"')
+
+        return has_perm
+
+    def _has_permission_fast(self, apk_path: Path, permission: str) -> Optional[bool]:
+        """Look for permission in the binary manifest, None if undecidable"""
+        try:
+            with zipfile.ZipFile(apk_path) as apk:
+                manifest = apk.read("AndroidManifest.xml")
+        except (
+            OSError,
+            KeyError,
+            zipfile.BadZipFile,
+            # Unsupported compression, encrypted entry, corrupt deflate data:
+            # aapt may still cope, so leave the answer to it
+            NotImplementedError,
+            RuntimeError,
+            zlib.error,
+        ):
+            return None
+
+        # Binary AXML string pools hold length-prefixed, NUL-terminated
+        # UTF-16LE or UTF-8 strings; matching the length too rules out pool
+        # entries that merely end with the permission name
+        utf16 = permission.encode("utf-16-le")
+        utf8 = permission.encode()
+        units = len(utf16) // 2
+        return (
+            _axml_len16(units) + utf16 + b"\x00\x00" in manifest
+            or _axml_len8(units) + _axml_len8(len(utf8)) + utf8 + b"\x00" in manifest
+        )
+
+    def _has_permission_aapt(self, apk_path: Path, permission: str) -> bool:
+        """Check permission with aapt"""
         try:
             result = subprocess.run(
                 ["aapt", "dump", "permissions", str(apk_path)],
-                capture_output=True,
-                text=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
                 check=True,
             )
 
-            has_perm = permission in result.stdout
-
-            if has_perm:
-                self.logger.info(f'APK has permission "{permission}"')
-            else:
-                self.logger.info(f'APK does not have permission "{permission}"')
-
-            return has_perm
+            # Byte-level search avoids decoding aapt's whole output
+            return permission.encode() in result.stdout
 
         except subprocess.CalledProcessError as e:
             raise APKError(f"Failed to check permissions: {e}")
 
     def get_main_activity(self, apk_path: Path) -> Optional[str]:
         """Get main activity class name from APK"""
-        try:
-            result = subprocess.run(
-                ["aapt", "dump", "badging", str(apk_path)],
-                capture_output=True,
-                text=True,
-                check=True,
-            )
-
-            for line in result.stdout.split("\n"):
-                if "launchable-activity:" in line:
-                    # Extract activity name
-                    name_start = line.find("name=")
-                    if name_start != -1:
-                        name_part = line[name_start:].split()[0]
-                        activity_name = name_part.replace("name=", "").strip("'\"")
-
-                        self.logger.info(f"Found main activity: {activity_name}")
-                        return activity_name
-
-            self.logger.warning("No main activity found")
-            return None
-
-        except subprocess.CalledProcessError as e:
-            raise APKError(f"Failed to get main activity: {e}")
+        cmd = ["aapt", "dump", "badging", str(apk_path)]
+
+        # Stream the badging dump and stop aapt as soon as the line is found
+        with subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        ) as proc:
+            for raw_line in proc.stdout:
+                match = _LAUNCHABLE_ACTIVITY_RE.search(raw_line)
+                if match:
+                    activity_name = _decode(match.group(1))
+                    proc.terminate()
+
+                    self.logger.info(f"Found main activity: {activity_name}")
+                    return activity_name
+
+        if proc.returncode != 0:
+            error = subprocess.CalledProcessError(proc.returncode, cmd)
+            raise APKError(f"Failed to get main activity: {error}")
+
+        self.logger.warning("No main activity found")
+        return None
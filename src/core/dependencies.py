@@ -3,15 +3,29 @@
 FridAPK - Dependencies checker
 """
 
+import functools
+import json
+import os
 import shutil
 import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
 from exceptions import DependencyError
 from utils.logger import Logger
 
 
+def _disk_cache_path() -> Path:
+    """Locate the cache of tools that passed their check (path -> mtime)"""
+    cache_home = os.getenv("XDG_CACHE_HOME")
+    # Path.home() raises RuntimeError without HOME or a passwd entry
+    base = Path(cache_home) if cache_home else Path.home() / ".cache"
+    return base / "fridapk" / "deps.json"
+
+
 @dataclass
 class Dependency:
     """Represents a system dependency"""
@@ -24,12 +38,45 @@ class Dependency:
     description: str = ""
 
 
+@functools.lru_cache(maxsize=None)
+def _probe(
+    command: str, check_args: Tuple[str, ...], check_output_contains: Optional[str]
+) -> Tuple[bool, str]:
+    """Run a tool's check command once per process, returning (ok, reason)"""
+    try:
+        result = subprocess.run(
+            [command, *check_args],
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+
+        # For some commands, we need to check stderr instead of stdout
+        output = result.stdout + result.stderr
+
+        # Check if specific output is required
+        if (
+            check_output_contains
+            and check_output_contains.lower() not in output.lower()
+        ):
+            return False, "found but not working correctly"
+
+        return True, "is available"
+
+    except subprocess.TimeoutExpired:
+        return False, "check timed out"
+    except subprocess.SubprocessError as e:
+        return False, f"check failed: {str(e)}"
+
+
 class DependencyChecker:
     """Manages and checks system dependencies"""
 
     def __init__(self, logger: Logger):
         self.logger = logger
         self.dependencies = self._init_dependencies()
+        self._disk_cache: Optional[Dict[str, float]] = None
+        self._disk_cache_lock = threading.Lock()
 
     def _init_dependencies(self) -> Dict[str, Dependency]:
         """Initialize dependency definitions"""
@@ -58,12 +105,6 @@ class DependencyChecker:
                 check_args=["--version"],
                 description="APK reverse engineering tool",
             ),
-            "unxz": Dependency(
-                name="unxz",
-                command="unxz",
-                check_args=["--version"],
-                description="XZ decompression utility",
-            ),
             "keytool": Dependency(
                 name="Keytool",
                 command="keytool",
@@ -71,12 +112,6 @@ class DependencyChecker:
                 check_output_contains="Key and Certificate",
                 description="Java keystore management tool",
             ),
-            "jarsigner": Dependency(
-                name="Jarsigner",
-                command="jarsigner",
-                check_args=["-help"],
-                description="Java JAR signing tool",
-            ),
             "zipalign": Dependency(
                 name="Zipalign",
                 command="zipalign",
@@ -88,8 +123,7 @@ class DependencyChecker:
                 name="APKSigner",
                 command="apksigner",
                 check_args=["--help"],
-                required=False,
-                description="Android APK v2 signing tool",
+                description="Android APK signing tool",
             ),
         }
 
@@ -101,37 +135,67 @@ class DependencyChecker:
         dep = self.dependencies[dep_name]
 
         # First check if command exists in PATH
-        if not shutil.which(dep.command):
+        path = shutil.which(dep.command)
+        if not path:
             return False, f"{dep.name} not found in PATH"
 
         try:
-            # Run the check command
-            result = subprocess.run(
-                [dep.command] + dep.check_args,
-                capture_output=True,
-                text=True,
-                timeout=10,
-            )
+            # A previous run already validated this exact binary
+            mtime = Path(path).stat().st_mtime
+            with self._disk_cache_lock:
+                cached_mtime = self._load_disk_cache().get(path)
+            if cached_mtime == mtime:
+                return True, f"{dep.name} is available"
 
-            # For some commands, we need to check stderr instead of stdout
-            output = result.stdout + result.stderr
+            is_satisfied, reason = _probe(
+                dep.command, tuple(dep.check_args), dep.check_output_contains
+            )
 
-            # Check if specific output is required
-            if (
-                dep.check_output_contains
-                and dep.check_output_contains.lower() not in output.lower()
-            ):
-                return False, f"{dep.name} found but not working correctly"
+            # Only successes are persisted: failures may be transient
+            if is_satisfied:
+                with self._disk_cache_lock:
+                    self._disk_cache[path] = mtime
+                    self._save_disk_cache()
 
-            return True, f"{dep.name} is available"
+            return is_satisfied, f"{dep.name} {reason}"
 
-        except subprocess.TimeoutExpired:
-            return False, f"{dep.name} check timed out"
-        except subprocess.SubprocessError as e:
-            return False, f"{dep.name} check failed: {str(e)}"
         except Exception as e:
             return False, f"Unexpected error checking {dep.name}: {str(e)}"
 
+    def _load_disk_cache(self) -> Dict[str, float]:
+        """Load persisted dependency check results"""
+        if self._disk_cache is None:
+            try:
+                with _disk_cache_path().open(encoding="utf-8") as f:
+                    cache = json.load(f)
+            except (OSError, ValueError, RuntimeError):
+                cache = None
+
+            # Valid JSON of the wrong shape is as good as no cache
+            self._disk_cache = cache if isinstance(cache, dict) else {}
+
+        return self._disk_cache
+
+    def _save_disk_cache(self) -> None:
+        """Persist dependency check results (best effort)"""
+        try:
+            cache_path = _disk_cache_path()
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with cache_path.open("w", encoding="utf-8") as f:
+                json.dump(self._disk_cache, f)
+        except (OSError, RuntimeError) as e:
+            self.logger.debug(f"Could not write dependency cache: {e}")
+
+    def _check_concurrently(self, dep_names: List[str]) -> Dict[str, Tuple[bool, str]]:
+        """Check several dependencies at once, results in the given order"""
+        if not dep_names:
+            return {}
+
+        # Each check is an I/O-bound subprocess, so run them concurrently
+        with ThreadPoolExecutor(max_workers=len(dep_names)) as executor:
+            results = executor.map(self.check_dependency, dep_names)
+            return dict(zip(dep_names, results))
+
     def check_all_dependencies(
         self, required_only: bool = False
     ) -> Dict[str, Tuple[bool, str]]:
@@ -140,17 +204,26 @@ class DependencyChecker:
 
         self.logger.info("Checking dependencies...")
 
-        for dep_name, dep in self.dependencies.items():
-            if required_only and not dep.required:
-                continue
+        deps = [
+            (dep_name, dep)
+            for dep_name, dep in self.dependencies.items()
+            if dep.required or not required_only
+        ]
+        if not deps:
+            return results
+
+        checked = self._check_concurrently([dep_name for dep_name, _ in deps])
 
-            is_satisfied, message = self.check_dependency(dep_name)
-            results[dep_name] = (is_satisfied, message)
+        # Log in definition order regardless of completion order
+        with self.logger.batched():
+            for dep_name, dep in deps:
+                is_satisfied, message = checked[dep_name]
+                results[dep_name] = (is_satisfied, message)
 
-            if is_satisfied:
-                self.logger.debug(f"✓ {dep.name}: {message}")
-            else:
-                self.logger.warning(f"✗ {dep.name}: {message}")
+                if is_satisfied:
+                    self.logger.debug(f"✓ {dep.name}: {message}")
+                else:
+                    self.logger.warning(f"✗ {dep.name}: {message}")
 
         return results
 
@@ -161,10 +234,9 @@ class DependencyChecker:
                 name for name, dep in self.dependencies.items() if dep.required
             ]
 
-        results = {}
-        for dep_name in required_deps:
-            if dep_name in self.dependencies:
-                results[dep_name] = self.check_dependency(dep_name)
+        results = self._check_concurrently(
+            [dep_name for dep_name in required_deps if dep_name in self.dependencies]
+        )
 
         failed_deps = [
             name for name, (satisfied, _) in results.items() if not satisfied
@@ -188,12 +260,11 @@ class DependencyChecker:
             "aapt": "Install Android SDK Build Tools",
             "adb": "Install Android SDK Platform Tools",
             "zipalign": "Install Android SDK Build Tools",
-            "unxz": "apt-get install xz-utils (Ubuntu/Debian) or "
-            "brew install xz (macOS)",
             "keytool": "Install Java JDK",
-            "jarsigner": "Install Java JDK",
+            "apksigner": "Install Android SDK Build Tools",
         }
 
-        for dep in failed_deps:
-            if dep in help_text:
-                self.logger.info(f"  {dep}: {help_text[dep]}")
+        with self.logger.batched():
+            for dep in failed_deps:
+                if dep in help_text:
+                    self.logger.info(f"  {dep}: {help_text[dep]}")
@@ -3,19 +3,59 @@
 FridAPK - Frida Gadget Manager
 """
 
+import functools
+import json
+import lzma
+import os
 import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
 
-from config import Architecture, Config, URLs
+from config import Architecture, Config, FileNames, URLs
 from exceptions import DependencyError, GadgetError
 from utils.logger import Logger
 
+MAX_DOWNLOAD_WORKERS = 8
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+PROGRESS_STEP = 10
+PROGRESS_INTERVAL = 0.5
 
-@dataclass
+
+# Checked in order: 64-bit names contain their 32-bit counterparts
+_ARCH_RULES = (
+    ("arm64", Architecture.ARM64),
+    ("x86_64", Architecture.X64),
+    ("i386", Architecture.X86),
+    ("x86", Architecture.X86),
+    ("arm", Architecture.ARM),
+)
+
+
+@functools.lru_cache(maxsize=128)
+def detect_architecture(filename: str) -> str:
+    """Detect architecture from gadget filename"""
+    filename = filename.lower()
+
+    for marker, arch in _ARCH_RULES:
+        if marker in filename:
+            return arch
+
+    return "unknown"
+
+
+# dataclass(slots=True) needs Python 3.10+, older versions keep __dict__
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_SLOTS)
 class GadgetInfo:
     """Information about a Frida gadget"""
 
@@ -33,15 +73,45 @@ class GadgetManager:
         self.logger = logger
         self.config = config
         self.session = requests.Session()
-        self.session.headers.update({"User-Agent": "FridAPK/1.0"})
+        self.session.headers.update(
+            {"User-Agent": "FridAPK/1.0", "Accept": "application/vnd.github+json"}
+        )
+
+        # One pooled connection per download worker
+        adapter = HTTPAdapter(
+            pool_connections=MAX_DOWNLOAD_WORKERS, pool_maxsize=MAX_DOWNLOAD_WORKERS
+        )
+        self.session.mount("https://", adapter)
+
+        # Neither the Frida install nor the device changes mid-run
+        self._frida_version: Optional[str] = None
+        self._device_arch: Optional[str] = None
+
+    def clear_cache(self) -> None:
+        """Forget cached Frida version and device architecture"""
+        self._frida_version = None
+        self._device_arch = None
 
     def get_frida_version(self) -> str:
         """Get installed Frida version"""
+        if self._frida_version is not None:
+            return self._frida_version
+
+        # Ask the Python bindings first, forking the CLI costs an interpreter start
+        try:
+            import frida
+
+            self._frida_version = frida.__version__
+            return self._frida_version
+        except (ImportError, AttributeError):
+            pass
+
         try:
             result = subprocess.run(
                 ["frida", "--version"], capture_output=True, text=True, check=True
             )
-            return result.stdout.strip()
+            self._frida_version = result.stdout.strip()
+            return self._frida_version
         except (subprocess.SubprocessError, FileNotFoundError) as e:
             raise DependencyError(f"Frida not found or not working: {e}")
 
@@ -59,129 +129,193 @@ class GadgetManager:
         version_dir = self.config.gadgets_dir / version
         version_dir.mkdir(parents=True, exist_ok=True)
 
-        # Download gadgets
-        downloaded = []
-        for gadget in gadgets:
-            local_file = version_dir / gadget.name
-
-            # Skip if already exists (uncompressed version)
-            if local_file.with_suffix("").exists():
-                self.logger.info(f"{gadget.name} already exists. Skipping.")
-                gadget.local_path = local_file.with_suffix("")
-                downloaded.append(gadget)
-                continue
-
-            # Download
-            self._download_file(gadget.url, local_file)
-
-            # Extract if compressed
-            if local_file.suffix == ".xz":
-                self._extract_xz(local_file)
-                gadget.local_path = local_file.with_suffix("")
-            else:
-                gadget.local_path = local_file
-
-            downloaded.append(gadget)
+        # Download gadgets concurrently, downloads are network-bound
+        workers = min(MAX_DOWNLOAD_WORKERS, len(gadgets))
+        executor = ThreadPoolExecutor(max_workers=workers)
+        stop = threading.Event()
+        futures = []
+        try:
+            futures = [
+                executor.submit(self._download_one, gadget, version_dir, stop)
+                for gadget in gadgets
+            ]
+            downloaded = [future.result() for future in futures]
+        except BaseException:
+            # Ctrl-C or a failed download: drop queued downloads and tell
+            # running ones to stop (cancel_futures needs Python 3.9)
+            stop.set()
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            executor.shutdown(wait=False)
 
         self.logger.success(f"Downloaded {len(downloaded)} gadgets")
         return downloaded
 
+    def _download_one(
+        self,
+        gadget: GadgetInfo,
+        version_dir: Path,
+        stop: Optional[threading.Event] = None,
+    ) -> GadgetInfo:
+        """Download and extract a single gadget"""
+        local_file = version_dir / gadget.name
+        compressed = local_file.suffix == ".xz"
+        gadget.local_path = local_file.with_suffix("") if compressed else local_file
+
+        # Skip if already exists (uncompressed version)
+        if gadget.local_path.exists():
+            self.logger.info(f"{gadget.name} already exists. Skipping.")
+            return gadget
+
+        # Download, decompressing on the fly so bytes hit the disk once
+        self._download_file(
+            gadget.url, gadget.local_path, decompress_xz=compressed, stop=stop
+        )
+
+        return gadget
+
     def _get_gadgets_for_version(self, version: str) -> List[GadgetInfo]:
         """Get gadget download URLs for a specific version"""
         try:
-            # Get releases list
-            response = self.session.get(URLs.FRIDA_RELEASES, timeout=30)
-            response.raise_for_status()
-            releases = response.json()
-
-            # Find the specific version
-            target_release = None
-            for release in releases:
-                if release["tag_name"] == version:
-                    target_release = release
-                    break
-
-            if not target_release:
-                raise GadgetError(f"Version {version} not found in releases")
+            # Revalidate a cached release with its ETag (304 has no body)
+            cache = self._load_release_cache()
+            cached = cache.get(version)
+            headers = {"If-None-Match": cached["etag"]} if cached else {}
+
+            # Fetch the tagged release directly instead of scanning the list
+            response = self.session.get(
+                f"{URLs.FRIDA_RELEASES}/tags/{version}", headers=headers, timeout=30
+            )
 
-            # Get release details
-            response = self.session.get(target_release["url"], timeout=30)
-            response.raise_for_status()
-            release_data = response.json()
-
-            # Extract gadget assets
-            gadgets = []
-            for asset in release_data.get("assets", []):
-                name = asset["name"]
-                if "gadget" in name.lower() and "android" in name.lower():
-                    arch = self._detect_architecture_from_filename(name)
-                    gadgets.append(
-                        GadgetInfo(
-                            name=name,
-                            url=asset["browser_download_url"],
-                            arch=arch,
-                            version=version,
-                        )
-                    )
-
-            return gadgets
+            if cached and response.status_code == 304:
+                self.logger.info(f"Release {version} unchanged, using cached assets")
+                assets = cached["assets"]
+            else:
+                if response.status_code == 404:
+                    raise GadgetError(f"Version {version} not found in releases")
+                response.raise_for_status()
+                release_data = response.json()
+
+                # Keep only the gadget assets
+                assets = [
+                    {
+                        "name": asset["name"],
+                        "browser_download_url": asset["browser_download_url"],
+                    }
+                    for asset in release_data.get("assets", [])
+                    if "gadget" in asset["name"].lower()
+                    and "android" in asset["name"].lower()
+                ]
+
+                etag = response.headers.get("ETag")
+                if etag:
+                    cache[version] = {"etag": etag, "assets": assets}
+                    self._save_release_cache(cache)
+
+            return [
+                GadgetInfo(
+                    name=asset["name"],
+                    url=asset["browser_download_url"],
+                    arch=detect_architecture(asset["name"]),
+                    version=version,
+                )
+                for asset in assets
+            ]
 
         except requests.RequestException as e:
             raise GadgetError(f"Failed to fetch release information: {e}")
-        except KeyError as e:
+        except (KeyError, TypeError) as e:
             raise GadgetError(f"Unexpected API response format: {e}")
 
-    def _detect_architecture_from_filename(self, filename: str) -> str:
-        """Detect architecture from gadget filename"""
-        filename = filename.lower()
-
-        if "arm64" in filename:
-            return Architecture.ARM64
-        elif "arm" in filename:
-            return Architecture.ARM
-        elif "x86_64" in filename:
-            return Architecture.X64
-        elif "i386" in filename or "x86" in filename:
-            return Architecture.X86
-
-        return "unknown"
+    def _load_release_cache(self) -> Dict[str, Dict]:
+        """Load cached release ETags and gadget assets"""
+        cache_path = self.config.gadgets_dir / FileNames.RELEASE_CACHE
+        try:
+            with open(cache_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_release_cache(self, cache: Dict[str, Dict]) -> None:
+        """Persist release ETags and gadget assets (best effort)"""
+        cache_path = self.config.gadgets_dir / FileNames.RELEASE_CACHE
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(cache_path, "w", encoding="utf-8") as f:
+                json.dump(cache, f)
+        except OSError as e:
+            self.logger.debug(f"Could not write release cache: {e}")
+
+    def _download_file(
+        self,
+        url: str,
+        target_path: Path,
+        decompress_xz: bool = False,
+        stop: Optional[threading.Event] = None,
+    ) -> None:
+        """Download a file with progress indication, optionally un-XZ-ing it"""
+        decompressor = lzma.LZMADecompressor() if decompress_xz else None
+
+        # Write next to the target and rename once complete, so an interrupted
+        # download never leaves a truncated gadget that later runs would reuse
+        part_path = target_path.with_name(target_path.name + ".part")
 
-    def _download_file(self, url: str, target_path: Path) -> None:
-        """Download a file with progress indication"""
         try:
             response = self.session.get(url, stream=True, timeout=30)
             response.raise_for_status()
 
             total_size = int(response.headers.get("content-length", 0))
             downloaded = 0
+            last_bucket = -1
+            last_log = 0.0
 
-            with open(target_path, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
+            with open(part_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    if stop is not None and stop.is_set():
+                        raise GadgetError(f"Download of {target_path.name} cancelled")
                     if chunk:
-                        f.write(chunk)
+                        if decompressor:
+                            f.write(decompressor.decompress(chunk))
+                        else:
+                            f.write(chunk)
                         downloaded += len(chunk)
 
                         if total_size > 0:
-                            progress = int(downloaded * 100 / total_size)
-                            self.logger.info(
-                                f"Downloading {target_path.name} - {progress: 03d}%"
-                            )
-
+                            # Report every PROGRESS_STEP percent, at most once
+                            # per PROGRESS_INTERVAL seconds (100% always shows)
+                            progress = downloaded * 100 // total_size
+                            bucket = progress // PROGRESS_STEP
+                            now = time.monotonic()
+                            if bucket != last_bucket and (
+                                now - last_log >= PROGRESS_INTERVAL or progress == 100
+                            ):
+                                last_bucket = bucket
+                                last_log = now
+                                self.logger.info(
+                                    f"Downloading {target_path.name} - {progress: 03d}%"
+                                )
+
+            if decompressor and not decompressor.eof:
+                raise lzma.LZMAError("Compressed data ended before the end marker")
+
+            part_path.replace(target_path)
             self.logger.success(f"Downloaded {target_path.name}")
 
         except requests.RequestException as e:
             raise GadgetError(f"Failed to download {url}: {e}")
-
-    def _extract_xz(self, compressed_file: Path) -> None:
-        """Extract XZ compressed file"""
-        try:
-            subprocess.run(["unxz", str(compressed_file)], check=True)
-            self.logger.info(f"Extracted {compressed_file.name}")
-        except subprocess.SubprocessError as e:
-            raise GadgetError(f"Failed to extract {compressed_file}: {e}")
+        except lzma.LZMAError as e:
+            raise GadgetError(f"Failed to extract {url}: {e}")
+        finally:
+            # Gone already after a successful rename
+            part_path.unlink(missing_ok=True)
 
     def get_device_architecture(self) -> str:
         """Get connected device architecture via ADB"""
+        if self._device_arch is not None:
+            return self._device_arch
+
         try:
             self.logger.info("Waiting for device...")
             subprocess.run(["adb", "wait-for-device"], check=True, timeout=30)
@@ -197,25 +331,26 @@ class GadgetManager:
             self.logger.info(f"Device ABI: {abi}")
 
             # Map ABI to our architecture constants
-            arch_mapping = {
-                "armeabi": Architecture.ARM,
-                "armeabi-v7a": Architecture.ARM,
-                "arm64-v8a": Architecture.ARM64,
-                "x86": Architecture.X86,
-                "x86_64": Architecture.X64,
-            }
-
-            return arch_mapping.get(abi, abi)
+            self._device_arch = self.config.arch_mapping.get(abi, abi)
+            return self._device_arch
 
         except subprocess.SubprocessError as e:
             raise GadgetError(f"Failed to get device architecture: {e}")
 
     def find_gadget_for_architecture(self, arch: str) -> Optional[Path]:
         """Find appropriate gadget for given architecture"""
-        for gadget_file in self.config.gadgets_dir.glob("*.so"):
-            if arch in gadget_file.name.lower():
-                self.logger.info(f"Found gadget for {arch}: {gadget_file.name}")
-                return gadget_file
+        try:
+            # DirEntry caches the file type from the directory read
+            with os.scandir(self.config.gadgets_dir) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(".so") or not entry.is_file():
+                        continue
+
+                    if detect_architecture(entry.name) == arch:
+                        self.logger.info(f"Found gadget for {arch}: {entry.name}")
+                        return Path(entry.path)
+        except FileNotFoundError:
+            pass
 
         self.logger.warning(f"No gadget found for architecture: {arch}")
         return None
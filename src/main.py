@@ -3,20 +3,31 @@
 FridAPK v2.0 - Main application
 """
 
+import functools
+import mmap
+import os
+import re
 import shutil
 import signal
 import subprocess
 import sys
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 from cli import CLI
-from config import Config
-from core.apk_processor import APKProcessor
-from core.dependencies import DependencyChecker
-from core.gadgets import GadgetManager
+from config import Architecture, Config
 from exceptions import FridAPKError, GadgetError
 from utils.logger import Logger, VerbosityLevel
 
+if TYPE_CHECKING:
+    from core.apk_processor import APKProcessor
+    from core.dependencies import DependencyChecker
+    from core.gadgets import GadgetManager
+
+# Opening tags, skipping any '>' inside quoted attribute values
+_MANIFEST_TAG_RE = re.compile(r"""<manifest\b(?:[^>"']|"[^"]*"|'[^']*')*>""")
+_APPLICATION_TAG_RE = re.compile(r"""<application\b(?:[^>"']|"[^"]*"|'[^']*')*>""")
+
 
 class FridAPK:
     """Main FridAPK application"""
@@ -25,9 +36,31 @@ class FridAPK:
         self.cli = CLI()
         self.logger = Logger()
         self.config = Config()
-        self.dep_checker = DependencyChecker(self.logger)
-        self.gadget_manager = GadgetManager(self.logger, self.config)
-        self.apk_processor = APKProcessor(self.logger, self.config)
+
+    # The core components pull in requests and friends, so they are only
+    # imported and built once a command actually needs them; --help and the
+    # no-argument banner never do
+
+    @functools.cached_property
+    def dep_checker(self) -> "DependencyChecker":
+        """Dependency checker, built on first use"""
+        from core.dependencies import DependencyChecker
+
+        return DependencyChecker(self.logger)
+
+    @functools.cached_property
+    def gadget_manager(self) -> "GadgetManager":
+        """Gadget manager, built on first use"""
+        from core.gadgets import GadgetManager
+
+        return GadgetManager(self.logger, self.config)
+
+    @functools.cached_property
+    def apk_processor(self) -> "APKProcessor":
+        """APK processor, built on first use"""
+        from core.apk_processor import APKProcessor
+
+        return APKProcessor(self.logger, self.config)
 
     def run(self, args=None):
         """Run the application"""
@@ -43,7 +76,7 @@ class FridAPK:
             parsed_args = self.cli.parse_args(args)
 
             # Update logger verbosity
-            self.logger.set_verbosity(VerbosityLevel(parsed_args.verbosity))
+            self.logger.set_verbosity(parsed_args.verbosity)
 
             # Handle gadget updates
             if parsed_args.update_gadgets:
@@ -51,9 +84,6 @@ class FridAPK:
 
             # Check dependencies
             required_deps = ["frida", "aapt", "adb", "apktool"]
-            if not parsed_args.prevent_gadget:
-                required_deps.append("unxz")
-
             self.dep_checker.ensure_dependencies(required_deps)
 
             # Process APK
@@ -93,30 +123,35 @@ class FridAPK:
         temp_dir = self.apk_processor.create_temp_folder(apk_path)
 
         try:
+            # The gadget needs INTERNET; only check for it when injecting
+            needs_internet = (
+                not args.prevent_gadget
+                and not self.apk_processor.has_permission(
+                    apk_path, "android.permission.INTERNET"
+                )
+            )
+
             # Determine if we need to extract resources
             needs_resources = (
-                args.force_resources
-                or args.enable_user_certs
-                or (
-                    not args.prevent_gadget
-                    and not self.apk_processor.has_permission(
-                        apk_path, "android.permission.INTERNET"
-                    )
-                )
+                args.force_resources or args.enable_user_certs or needs_internet
             )
 
             # Extract APK
             self.apk_processor.extract_apk(apk_path, temp_dir, needs_resources)
 
-            # Add Internet permission if needed
-            if not args.prevent_gadget and not self.apk_processor.has_permission(
-                apk_path, "android.permission.INTERNET"
-            ):
-                self._inject_internet_permission(temp_dir)
+            # Patch manifest in memory and write it back once
+            if needs_internet or args.enable_user_certs:
+                manifest = self._load_manifest(temp_dir)
+
+                # Add Internet permission if needed
+                if needs_internet:
+                    manifest = self._inject_internet_permission(manifest)
 
-            # Enable user certificates if requested
-            if args.enable_user_certs:
-                self._enable_user_certificates(temp_dir)
+                # Enable user certificates if requested
+                if args.enable_user_certs:
+                    manifest = self._enable_user_certificates(temp_dir, manifest)
+
+                self._save_manifest(temp_dir, manifest)
 
             # Inject Frida gadget if not prevented
             if not args.prevent_gadget:
@@ -154,26 +189,28 @@ class FridAPK:
             self.logger.error(f"APK processing failed: {e}")
             return 1
 
-    def _inject_internet_permission(self, temp_dir: Path) -> None:
-        """Inject INTERNET permission into AndroidManifest.xml"""
+    def _load_manifest(self, temp_dir: Path) -> str:
+        """Read decoded AndroidManifest.xml"""
         manifest_path = temp_dir / "AndroidManifest.xml"
 
         if not manifest_path.exists():
             raise FridAPKError("AndroidManifest.xml not found")
 
-        self.logger.info("Injecting INTERNET permission...")
-
-        # Read manifest
         with open(manifest_path, encoding="utf-8") as f:
-            content = f.read()
+            return f.read()
 
-        # Find manifest tag
-        manifest_start = content.find("<manifest ")
-        if manifest_start == -1:
-            raise FridAPKError("Invalid AndroidManifest.xml format")
+    def _save_manifest(self, temp_dir: Path, content: str) -> None:
+        """Write patched AndroidManifest.xml"""
+        with open(temp_dir / "AndroidManifest.xml", "w", encoding="utf-8") as f:
+            f.write(content)
 
-        manifest_end = content.find(">", manifest_start)
-        if manifest_end == -1:
+    def _inject_internet_permission(self, content: str) -> str:
+        """Inject INTERNET permission into manifest content"""
+        self.logger.info("Injecting INTERNET permission...")
+
+        # Find manifest tag
+        match = _MANIFEST_TAG_RE.search(content)
+        if not match:
             raise FridAPKError("Invalid AndroidManifest.xml format")
 
         # Insert permission
@@ -181,20 +218,17 @@ class FridAPK:
             '    <uses-permission android:name="android.permission.INTERNET"/>'
         )
         new_content = (
-            content[: manifest_end + 1]
+            content[: match.end()]
             + "\n"
             + permission_tag
             + "\n"
-            + content[manifest_end + 1 :]
+            + content[match.end() :]
         )
 
-        # Write back
-        with open(manifest_path, "w", encoding="utf-8") as f:
-            f.write(new_content)
-
         self.logger.success("INTERNET permission added")
+        return new_content
 
-    def _enable_user_certificates(self, temp_dir: Path) -> None:
+    def _enable_user_certificates(self, temp_dir: Path, manifest: str) -> str:
         """Enable user certificate authorities"""
         self.logger.info("Enabling user certificate authorities...")
 
@@ -202,9 +236,10 @@ class FridAPK:
         self._create_network_security_config(temp_dir)
 
         # Update manifest
-        self._inject_network_security_config(temp_dir)
+        manifest = self._inject_network_security_config(manifest)
 
         self.logger.success("User certificates enabled")
+        return manifest
 
     def _create_network_security_config(self, temp_dir: Path) -> None:
         """Create network security configuration file"""
@@ -215,8 +250,9 @@ class FridAPK:
 
         if config_path.exists():
             self.logger.warning("network_security_config.xml already exists!")
-            with open(config_path) as f:
-                self.logger.info(f"Original content: \n{f.read()}")
+            # Only read the old file when it would actually be shown
+            if self.logger.is_enabled_for(VerbosityLevel.HIGH):
+                self.logger.info(f"Original content: \n{config_path.read_text()}")
 
             if not self.logger.confirm("Replace existing file?"):
                 return
@@ -237,38 +273,31 @@ class FridAPK:
 
         self.logger.info("Network security config created")
 
-    def _inject_network_security_config(self, temp_dir: Path) -> None:
-        """Inject network security config reference into manifest"""
-        manifest_path = temp_dir / "AndroidManifest.xml"
-
-        with open(manifest_path) as f:
-            content = f.read()
-
+    def _inject_network_security_config(self, content: str) -> str:
+        """Inject network security config reference into manifest content"""
         # Find application tag
-        app_start = content.find("<application ")
-        if app_start == -1:
+        match = _APPLICATION_TAG_RE.search(content)
+        if not match:
             raise FridAPKError("No <application> tag found in manifest")
 
-        app_end = content.find(">", app_start)
-        if app_end == -1:
-            raise FridAPKError("Invalid <application> tag in manifest")
-
         # Check if already has network security config
-        if "networkSecurityConfig" in content[app_start:app_end]:
+        if "networkSecurityConfig" in match.group():
             self.logger.warning("Application already has networkSecurityConfig")
-            return
+            return content
+
+        # Insert attribute before '>' (or '/>' for an empty element)
+        app_end = match.end() - 1
+        if content[app_end - 1] == "/":
+            app_end -= 1
 
-        # Insert attribute
         new_content = (
             content[:app_end]
             + ' android:networkSecurityConfig="@xml/network_security_config"'
             + content[app_end:]
         )
 
-        with open(manifest_path, "w") as f:
-            f.write(new_content)
-
         self.logger.info("Network security config reference added to manifest")
+        return new_content
 
     def _inject_frida_gadget(self, args, apk_path: Path, temp_dir: Path) -> None:
         """Inject Frida gadget into APK"""
@@ -293,7 +322,18 @@ class FridAPK:
         """Find smali file for given activity class"""
         smali_path = activity_class.replace(".", "/") + ".smali"
 
-        # Search in smali directories
+        # Try apktool's standard layout first: smali, smali_classes2, ...
+        smali_dir = temp_dir / "smali"
+        index = 1
+        while smali_dir.is_dir():
+            candidate = smali_dir / smali_path
+            if candidate.exists():
+                self.logger.info(f"Found smali file: {candidate}")
+                return candidate
+            index += 1
+            smali_dir = temp_dir / f"smali_classes{index}"
+
+        # Fall back to scanning for non-standard smali directories
         for smali_dir in temp_dir.glob("smali*"):
             candidate = smali_dir / smali_path
             if candidate.exists():
@@ -305,26 +345,30 @@ class FridAPK:
 
     def _inject_frida_loader(self, smali_path: Path) -> None:
         """Inject Frida loader code into smali file"""
-        with open(smali_path) as f:
-            content = f.read()
+        if smali_path.stat().st_size == 0:
+            raise FridAPKError("Could not find direct methods section")
 
-        if "frida-gadget" in content:
-            self.logger.info("Frida loader already present, skipping injection")
-            return
+        # Search the file through a read-only mapping instead of loading it
+        with open(smali_path, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as content:
+            if content.find(b"frida-gadget") != -1:
+                self.logger.info("Frida loader already present, skipping injection")
+                return
 
-        # Find injection point
-        direct_methods_start = content.find("# direct methods")
-        if direct_methods_start == -1:
-            raise FridAPKError("Could not find direct methods section")
+            # Find injection point
+            direct_methods_start = content.find(b"# direct methods")
+            if direct_methods_start == -1:
+                raise FridAPKError("Could not find direct methods section")
 
-        # Look for existing class constructor
-        clinit_start = content.find(
-            ".method static constructor <clinit>()V", direct_methods_start
-        )
+            # Look for existing class constructor
+            clinit_start = content.find(
+                b".method static constructor <clinit>()V", direct_methods_start
+            )
 
-        if clinit_start == -1:
-            # No existing constructor, create one
-            injection_code = """
+            if clinit_start == -1:
+                # No existing constructor, create one
+                injection_code = b"""
 .method static constructor <clinit>()V
     .locals 1
 
@@ -336,33 +380,34 @@ class FridAPK:
     return-void
 .end method
 """
-            # Insert after direct methods comment
-            direct_methods_end = content.find("\n", direct_methods_start)
-            new_content = (
-                content[: direct_methods_end + 1]
-                + injection_code
-                + content[direct_methods_end + 1 :]
-            )
-        else:
-            # Existing constructor, inject into it
-            prologue_pos = content.find(".prologue", clinit_start)
-            if prologue_pos == -1:
-                raise FridAPKError("Could not find .prologue in class constructor")
-
-            prologue_end = content.find("\n", prologue_pos) + 1
+                # Insert after direct methods comment
+                insert_pos = content.find(b"\n", direct_methods_start) + 1
+            else:
+                # Existing constructor, inject into it
+                prologue_pos = content.find(b".prologue", clinit_start)
+                if prologue_pos == -1:
+                    raise FridAPKError("Could not find .prologue in class constructor")
 
-            injection_code = """    const-string v0, "frida-gadget"
+                injection_code = b"""    const-string v0, "frida-gadget"
 
     invoke-static {v0}, Ljava/lang/System;->loadLibrary(Ljava/lang/String;)V
 
 """
-
-            new_content = (
-                content[:prologue_end] + injection_code + content[prologue_end:]
-            )
-
-        with open(smali_path, "w") as f:
-            f.write(new_content)
+                insert_pos = content.find(b"\n", prologue_pos) + 1
+
+            # Write prefix, injection and suffix straight from the mapping
+            # into a sibling file, then swap it in
+            tmp_path = smali_path.with_suffix(".smali.tmp")
+            view = memoryview(content)
+            try:
+                with open(tmp_path, "wb") as out:
+                    out.write(view[:insert_pos])
+                    out.write(injection_code)
+                    out.write(view[insert_pos:])
+            finally:
+                view.release()
+
+        tmp_path.replace(smali_path)
 
         self.logger.success("Frida loader injected into smali file")
 
@@ -393,20 +438,22 @@ class FridAPK:
         self, temp_dir: Path, gadget_path: Path, autoload_script: Path = None
     ) -> None:
         """Copy Frida gadget and related files to APK"""
+        from core.gadgets import detect_architecture
+
         # Determine architecture and create lib directories
-        arch = self._get_arch_from_gadget(gadget_path.name)
+        arch = detect_architecture(gadget_path.name)
         lib_dirs = self._create_lib_directories(temp_dir, arch)
 
         for lib_dir in lib_dirs:
             # Copy gadget
             target_gadget = lib_dir / "libfrida-gadget.so"
-            shutil.copy2(gadget_path, target_gadget)
+            self._copy_file(gadget_path, target_gadget)
             self.logger.info(f"Copied gadget to {target_gadget}")
 
             # Copy autoload script if provided
             if autoload_script:
                 target_script = lib_dir / "libhook.js.so"
-                shutil.copy2(autoload_script, target_script)
+                self._copy_file(autoload_script, target_script)
                 self.logger.info(f"Copied autoload script to {target_script}")
 
                 # Create config file for autoload
@@ -425,35 +472,37 @@ class FridAPK:
                     f.write(config_content.strip())
                 self.logger.info(f"Created config file at {target_config}")
 
-    def _get_arch_from_gadget(self, filename: str) -> str:
-        """Determine architecture from gadget filename"""
-        filename = filename.lower()
-
-        if "arm64" in filename:
-            return "arm64"
-        elif "arm" in filename:
-            return "arm"
-        elif "x86_64" in filename:
-            return "x86_64"
-        elif "i386" in filename or "x86" in filename:
-            return "x86"
-
-        return "arm"  # default fallback
+    def _copy_file(self, source: Path, target: Path) -> None:
+        """Copy source to target, kernel-side where possible"""
+        # Never hardlink: the temp tree may be edited in place (--wait,
+        # --exec-command), which must not touch the user's or cached files
+        try:
+            # Kernel-side copy (a reflink on CoW filesystems), Linux only
+            with open(source, "rb") as src, open(target, "wb") as dst:
+                remaining = os.fstat(src.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            if remaining > 0:
+                raise OSError("copy_file_range stopped early")
+            shutil.copystat(source, target)
+        except (AttributeError, OSError):
+            shutil.copy2(source, target)
 
     def _create_lib_directories(self, temp_dir: Path, arch: str) -> list:
         """Create lib directories for the given architecture"""
         lib_base = temp_dir / "lib"
         lib_base.mkdir(exist_ok=True)
 
-        arch_mapping = {
-            "arm": ["armeabi", "armeabi-v7a"],
-            "arm64": ["arm64-v8a"],
-            "x86": ["x86"],
-            "x86_64": ["x86_64"],
-        }
+        # Unrecognised gadget names default to ARM
+        lib_dirs = self.config.lib_dirs.get(
+            arch, self.config.lib_dirs[Architecture.ARM]
+        )
 
         dirs = []
-        for dir_name in arch_mapping.get(arch, ["armeabi-v7a"]):
+        for dir_name in lib_dirs:
             lib_dir = lib_base / dir_name
             lib_dir.mkdir(exist_ok=True)
             dirs.append(lib_dir)
@@ -486,7 +535,7 @@ class FridAPK:
             )
 
             if result.stdout:
-                self.logger.debug(f"Command output: {result.stdout}")
+                self.logger.debug("Command output: %s", result.stdout)
             if result.stderr:
                 self.logger.warning(f"Command stderr: {result.stderr}")
 
@@ -2,68 +2,292 @@
 """
 FridAPK - Logger utility module
 Provides consistent logging functionality
+
+Messages accept printf-style arguments that are only interpolated once the
+verbosity check has passed, so prefer ``logger.debug("x=%s", value)`` over
+f-strings. Wrap expensive or multi-line dumps in
+``if logger.is_enabled_for(VerbosityLevel.HIGH):`` so they are not even built
+when they would be dropped.
 """
 
+import contextlib
+import functools
+import os
 import sys
-from enum import IntEnum
+import threading
+from typing import Callable, Iterator, List, Optional
 
 from .colors import Colors
 
+# Lines between flushes when stdout is not a terminal
+FLUSH_EVERY = 64
+
+# The sys.stdout object last prepared for byte writes: (stream, out, interactive)
+_target = (None, None, False)
+
+# Worker threads log too, serialise writes and the flush counter
+_lock = threading.RLock()
+
+
+def _stderr_fd() -> Optional[int]:
+    """Return the stderr descriptor, None if stderr has been replaced"""
+    try:
+        return sys.stderr.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+_STDERR_FD = _stderr_fd()
+
+
+class _TextSink:
+    """Bytes front for a text stream that has no binary buffer"""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, data: bytes) -> int:
+        self._stream.write(data.decode("utf-8", "replace"))
+        return len(data)
+
+    def flush(self) -> None:
+        self._stream.flush()
 
-class VerbosityLevel(IntEnum):
-    """Verbosity levels for logging"""
+
+def _prepare_stdout(stream):
+    """Get a byte sink for stream and whether to flush after every line"""
+    buffer = getattr(stream, "buffer", None)
+    try:
+        # Text written to stdout goes straight to its buffer, so print()
+        # output and our byte writes stay in order
+        stream.flush()
+        stream.reconfigure(write_through=True)
+    except (AttributeError, ValueError):
+        buffer = None
+
+    if buffer is None:
+        # Replaced or unusual stream, e.g. a test harness capture
+        return _TextSink(stream), True
+
+    try:
+        # Terminals flush every line so progress stays visible
+        return buffer, stream.isatty()
+    except (AttributeError, ValueError):
+        return buffer, False
+
+
+def _stdout_target():
+    """Return the byte sink behind the current sys.stdout (call under _lock)"""
+    global _target
+    stream = sys.stdout
+    if _target[0] is not stream:
+        _target = (stream, *_prepare_stdout(stream))
+    return _target[1], _target[2]
+
+
+class VerbosityLevel:
+    """Verbosity levels for logging, plain ints for cheap comparisons"""
 
     LOW = 1  # only 'error' and 'done' messages
     MID = 2  # 'adding' messages too
     HIGH = 3  # all messages
 
 
+def _supports_color(stream) -> bool:
+    """Check whether ANSI colors should be written to a stream"""
+    if os.environ.get("NO_COLOR"):
+        return False
+    try:
+        return stream.isatty()
+    except (AttributeError, ValueError):
+        return False
+
+
+class _Plain:
+    """Stand-in for Colors when escape codes are disabled"""
+
+    BLUE = GREEN = RED = CYAN = YELLOW = ENDC = ""
+
+
+# Only color terminals, pipes and log files get plain text
+_OUT = Colors if _supports_color(sys.stdout) else _Plain
+_ERR = Colors if _supports_color(sys.stderr) else _Plain
+
+# Palette for other stdout output (CLI banner) so it follows the same rules
+STDOUT_COLORS = _OUT
+
+# Message kinds, used as indexes into _PREFIXES
+_INFO, _SUCCESS, _WARNING, _ERROR, _DEBUG = range(5)
+
+# Static parts of each message, encoded once and bound as default arguments
+# below so the hot path reads them as locals
+_PREFIXES = (
+    f"{_OUT.BLUE}[*] ".encode(),
+    f"{_OUT.GREEN}[+] ".encode(),
+    f"{_OUT.RED}[-] ".encode(),
+    f"{_ERR.RED}[!] ERROR: ".encode(),
+    f"{_OUT.CYAN}[DEBUG] ".encode(),
+)
+_SUFFIX = f"\n{_OUT.ENDC}".encode()
+_ERROR_SUFFIX = f"\n{_ERR.ENDC}".encode()
+_CONFIRM_PRE = f"{_OUT.YELLOW}[?] "
+_CONFIRM_SUFFIX = f" (y/N): {_OUT.ENDC}"
+_CRITICAL_PRE = f"{_OUT.RED}[!] "
+_CRITICAL_SUFFIX = f" (y/N) {_OUT.ENDC}"
+
+
+# Message kind and minimum verbosity for each method, error is always shown
+_LEVELS = (
+    ("info", _INFO, VerbosityLevel.HIGH),
+    ("success", _SUCCESS, VerbosityLevel.LOW),
+    ("warning", _WARNING, VerbosityLevel.LOW),
+    ("debug", _DEBUG, VerbosityLevel.HIGH),
+)
+
+
+def _noop(msg: str, *args) -> None:
+    """Drop a message below the current verbosity"""
+
+
 class Logger:
     """Logger class for consistent output formatting"""
 
-    def __init__(self, verbosity: VerbosityLevel = VerbosityLevel.HIGH):
-        self.verbosity = verbosity
+    __slots__ = (
+        "verbosity",
+        "info",
+        "success",
+        "warning",
+        "debug",
+        "_pending",
+        "_batch",
+    )
 
-    def set_verbosity(self, verbosity: VerbosityLevel) -> None:
+    # Bound by set_verbosity to _emit for their message kind, or to _noop
+    info: Callable[..., None]
+    success: Callable[..., None]
+    warning: Callable[..., None]
+    debug: Callable[..., None]
+
+    def __init__(self, verbosity: int = VerbosityLevel.HIGH):
+        self._pending = 0
+        self._batch: Optional[List[bytes]] = None
+        self.set_verbosity(verbosity)
+
+    def set_verbosity(self, verbosity: int) -> None:
         """Set verbosity level"""
-        self.verbosity = verbosity
+        verbosity = self.verbosity = int(verbosity)
+
+        # Disabled levels become a no-op, dropped calls skip the level check
+        for name, kind, level in _LEVELS:
+            if verbosity >= level:
+                setattr(self, name, functools.partial(self._emit, kind))
+            else:
+                setattr(self, name, _noop)
 
-    def info(self, msg: str) -> None:
-        """Print info message"""
-        if self.verbosity >= VerbosityLevel.HIGH:
-            sys.stdout.write(f"{Colors.BLUE}[*] {msg}\n{Colors.ENDC}")
+    def is_enabled_for(self, level: int) -> bool:
+        """Check whether messages at the given level are shown"""
+        return self.verbosity >= level
 
-    def success(self, msg: str) -> None:
-        """Print success message"""
-        if self.verbosity >= VerbosityLevel.LOW:
-            sys.stdout.write(f"{Colors.GREEN}[+] {msg}\n{Colors.ENDC}")
+    def flush(self) -> None:
+        """Write out buffered messages"""
+        with _lock:
+            out, _ = _stdout_target()
+            if self._batch:
+                # One write, so a line-buffered terminal flushes only once
+                out.write(b"".join(self._batch))
+                self._batch.clear()
+            out.flush()
+            self._pending = 0
 
-    def warning(self, msg: str) -> None:
-        """Print warning message"""
-        if self.verbosity >= VerbosityLevel.LOW:
-            sys.stdout.write(f"{Colors.RED}[-] {msg}\n{Colors.ENDC}")
+    @contextlib.contextmanager
+    def batched(self) -> Iterator[None]:
+        """Collect messages and emit them in one write when the block ends"""
+        if self._batch is not None:
+            # Already batching, the outer block flushes
+            yield
+            return
 
-    def error(self, msg: str) -> None:
+        self._batch = []
+        try:
+            yield
+        finally:
+            self.flush()
+            self._batch = None
+
+    def _emit(
+        self,
+        kind: int,
+        msg: str,
+        *args,
+        _prefixes: tuple = _PREFIXES,
+        _suffix: bytes = _SUFFIX,
+    ) -> None:
+        """Buffer a message line, flushing every FLUSH_EVERY lines"""
+        if args:
+            msg = msg % args
+
+        # Only the message itself needs encoding, the rest is pre-encoded
+        line = _prefixes[kind] + msg.encode("utf-8", "replace") + _suffix
+        with _lock:
+            if self._batch is not None:
+                self._batch.append(line)
+                return
+
+            # A whole line per write, lines from other threads can't split it
+            out, interactive = _stdout_target()
+            out.write(line)
+            self._pending += 1
+            if interactive or self._pending >= FLUSH_EVERY:
+                self.flush()
+
+    def error(
+        self,
+        msg: str,
+        *args,
+        _pre: bytes = _PREFIXES[_ERROR],
+        _suffix: bytes = _ERROR_SUFFIX,
+    ) -> None:
         """Print error message"""
-        sys.stderr.write(f"{Colors.RED}[!] ERROR: {msg}\n{Colors.ENDC}")
+        if args:
+            msg = msg % args
+        # Keep buffered output ahead of the error
+        self.flush()
+        data = _pre + msg.encode("utf-8", "replace") + _suffix
+        if _STDERR_FD is None:
+            sys.stderr.write(data.decode("utf-8", "replace"))
+            return
 
-    def debug(self, msg: str) -> None:
-        """Print debug message"""
-        if self.verbosity >= VerbosityLevel.HIGH:
-            sys.stdout.write(f"{Colors.CYAN}[DEBUG] {msg}\n{Colors.ENDC}")
+        # A single write(2) keeps the line whole next to other writers
+        written = os.write(_STDERR_FD, data)
+        while written < len(data):
+            data = data[written:]
+            written = os.write(_STDERR_FD, data)
+
+    def _ask(self, prompt: str) -> bool:
+        """Show a prompt after any pending output and read a y/N answer"""
+        data = prompt.encode("utf-8", "replace")
+        with _lock:
+            if self._batch is not None:
+                self._batch.append(data)
+            else:
+                _stdout_target()[0].write(data)
+            # Pending messages and the prompt go out together
+            self.flush()
 
-    def confirm(self, msg: str) -> bool:
-        """Ask for user confirmation"""
         try:
-            answer = input(f"{Colors.YELLOW}[?] {msg} (y/N): {Colors.ENDC}")
-            return answer.lower() in ("y", "yes")
-        except (KeyboardInterrupt, EOFError):
+            # Only the first character matters, no need to lowercase anything
+            return sys.stdin.readline().startswith(("y", "Y"))
+        except KeyboardInterrupt:
             return False
 
-    def critical_confirm(self, msg: str) -> bool:
+    def confirm(
+        self, msg: str, _pre: str = _CONFIRM_PRE, _suffix: str = _CONFIRM_SUFFIX
+    ) -> bool:
+        """Ask for user confirmation"""
+        return self._ask(_pre + msg + _suffix)
+
+    def critical_confirm(
+        self, msg: str, _pre: str = _CRITICAL_PRE, _suffix: str = _CRITICAL_SUFFIX
+    ) -> bool:
         """Ask for critical confirmation"""
-        try:
-            answer = input(f"{Colors.RED}[!] {msg} (y/N) {Colors.ENDC}")
-            return answer.lower() in ("y", "yes")
-        except (KeyboardInterrupt, EOFError):
-            return False
+        return self._ask(_pre + msg + _suffix)